@@ -1,5 +1,7 @@
 import pygame
+import numpy as np
 import random
+import array
 import os, sys
 import tomllib
 
@@ -49,21 +51,32 @@ class Emulator:
         )
         pygame.display.set_caption("Chip8 Emulator")
 
+        # only queue the events handle_input uses (mouse motion etc. would fill the queue)
+        self.input_events = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.VIDEORESIZE]
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.input_events)
+
         self.clock = pygame.time.Clock()
         self.font  = pygame.font.Font(None, 24)
 
-        self.mem   = [0] * 4096 # 4KiB of memory
-        self.regs  = [0] * 16  # 16 general purpose registers (8b)
+        # rendered debug text by (string, opaque), least recently used first
+        self._text_cache = {}
+        self._text_cache_size = 256
+
+        self.mem   = bytearray(4096) # 4KiB of memory
+        self.regs  = bytearray(16)  # 16 general purpose registers (8b)
         self.i_reg = 0        # I register (16b)
         self.pc    = 0x200       # Program counter (12b)
 
         # The stack size isn't defined in the original Chip-8 specification, 
-        # the original COSMAC VIP interpreter used 48 bytes
-        # (safe to increase if needed)
-        self.stack = [0] * 48 # 24 levels (program counter takes 2 bytes)
+        # the original COSMAC VIP interpreter used 48 bytes (24 levels),
+        # rounded up to 32 levels so the stack pointer wraps with a mask
+        # (safe to increase if needed, must stay a power of 2)
+        self.stack = array.array("H", [0] * 32) # 32 levels (one program counter each)
         self.sp    = 0 # Stack pointer (8b)
+        self.sp_mask = len(self.stack) - 1
 
-        self.kb = [0] * 16
+        self.kb = bytearray(16)
 
         # Keyboard layout
         # 1 2 3 4
@@ -84,15 +97,114 @@ class Emulator:
 
         # TIMERS
         self.sound_timer = 0 # not implemented
-        self.delay_timer = 0 # updated at screen refresh
+        self.delay_timer = 0 # updated every emulated frame
+
+        # Emulated frames (ipf instructions + a timer update) run at 60Hz
+        # wall-clock time, independent of how often the screen is drawn
+        self.frame_ms    = 1000 / 60
+        self._acc_ms     = 0 # wall-clock time not yet emulated
+        self._last_ticks = pygame.time.get_ticks()
 
         self.kb_interrupt = None
         self.interrupted = False
 
-        self.disp = bytearray([0] * self.resolution[0] * self.resolution[1])
+        # random bytes for CXNN, refilled once all have been used
+        self._rng_buf = random.randbytes(4096)
+        self._rng_idx = 0
+
+        # 8-bit display surface, palette index 0 is off and 1 is on
+        self._src_surf = pygame.Surface((self.resolution[0], self.resolution[1]), depth=8)
+        self.apply_palette(self._src_surf)
+
+        # disp is a view of the surface's pixels indexed [y, x], opcodes draw straight into it
+        # (this keeps _src_surf locked, it can be scaled but not blitted)
+        self.disp = pygame.surfarray.pixels2d(self._src_surf).T
+
+        # 32-bit copy of _src_surf for "smooth" scaling, which can't read paletted surfaces,
+        # filled by looking disp up in _palette32
+        self._src_surf32 = None
+        if self.scaling_method == "smooth":
+            self._src_surf32 = pygame.Surface((self.resolution[0], self.resolution[1]), depth=32)
+            self._disp32 = pygame.surfarray.pixels2d(self._src_surf32).T
+            self._palette32 = np.array([
+                self._src_surf32.map_rgb(self.off_color),
+                self._src_surf32.map_rgb(self.on_color),
+            ], dtype=self._disp32.dtype)
+
+        # scaled display output, only rebuilt when disp changes or the window is resized
+        self._disp_dirty  = True
+        self._cached_surf = None
+        self._cached_res  = None
+        self._scaled_surf = None # preallocated scaling target
+        self._target_size = None
 
         self.load_sprites()
 
+        # the built-in font unpacked to pixel rows, indexed [digit, row, col]
+        self.load_font_bits()
+
+        # decoded instruction traces by start address, see run()
+        self._traces = {}
+
+        # OPCODE DISPATCH
+        # Quirks are fixed at startup, so handlers affected by them are
+        # picked here instead of checking the quirk on every instruction
+
+        if not self.QUIRK_disp_wait:
+            opD = self._opD
+        elif self.QUIRK_disp_wait_faker:
+            opD = self._opD_wait_faker
+        else:
+            opD = self._opD_wait
+
+        # 0x00NN, indexed by the low byte
+        self._sys = {
+            0xE0: self._op0_E0,
+            0xEE: self._op0_EE,
+        }
+
+        # 0x8XYN, indexed by the low nibble
+        self._alu = {
+            0x0: self._op8_0,
+            0x1: self._op8_1_vF_reset if self.QUIRK_vF_reset else self._op8_1,
+            0x2: self._op8_2_vF_reset if self.QUIRK_vF_reset else self._op8_2,
+            0x3: self._op8_3_vF_reset if self.QUIRK_vF_reset else self._op8_3,
+            0x4: self._op8_4,
+            0x5: self._op8_5,
+            0x6: self._op8_6_shifting if self.QUIRK_shifting else self._op8_6,
+            0x7: self._op8_7,
+            0xE: self._op8_E_shifting if self.QUIRK_shifting else self._op8_E,
+        }
+
+        # 0xEXNN, indexed by the low byte
+        self._keys = {
+            0x9E: self._opE_9E,
+            0xA1: self._opE_A1,
+        }
+
+        # 0xFXNN, indexed by the low byte
+        self._misc = {
+            0x07: self._opF_07,
+            0x0A: self._opF_0A,
+            0x15: self._opF_15,
+            0x18: self._opF_18,
+            0x1E: self._opF_1E,
+            0x29: self._opF_29,
+            0x33: self._opF_33,
+            0x55: self._opF_55_memory if self.QUIRK_memory else self._opF_55,
+            0x65: self._opF_65_memory if self.QUIRK_memory else self._opF_65,
+        }
+
+        # indexed by the top nibble of the opcode, families with sub-opcodes
+        # hold (table, mask) and are resolved by decode()
+        self._top = [
+            (self._sys, 0x00FF), self._op1, self._op2, self._op3,
+            self._op4, self._op5, self._op6, self._op7,
+            (self._alu, 0x000F), self._op9, self._opA,
+            self._opB_jumping if self.QUIRK_jumping else self._opB,
+            self._opC, opD, (self._keys, 0x00FF), (self._misc, 0x00FF),
+        ]
+
     def load_sprites(self):
         sprites = [
             0xF0, 0x90, 0x90, 0x90, 0xF0, # 0
@@ -113,43 +225,77 @@ class Emulator:
             0xF0, 0x80, 0xF0, 0x80, 0x80, # F
         ]
 
-        for i, byte in enumerate(sprites):
-            self.mem[i] = byte
+        self.mem[:len(sprites)] = bytes(sprites)
+
+    def load_font_bits(self):
+        self._font_bits = np.unpackbits(
+            np.frombuffer(self.mem, dtype=np.uint8, count=16 * 5)
+        ).reshape(16, 5, 8)
+
+    def mem_written(self, addr, length):
+        # keep data derived from memory in sync with writes made by the program
+        if addr < 16 * 5:
+            self.load_font_bits()
+
+        # drop decoded traces that cover the written bytes
+        end = addr + length
+        stale = [pc for pc, trace in self._traces.items() if pc < end and trace[-1][4] > addr]
+        for pc in stale:
+            del self._traces[pc]
 
     def load_rom(self, path):
         with open(path, "rb") as f:
             data = f.read()
-            for i, byte in enumerate(data):
-                self.mem[0x200 + i] = byte
+            if 0x200 + len(data) > len(self.mem):
+                raise Exception(f"ROM too large: {len(data)} bytes")
+            self.mem[0x200:0x200 + len(data)] = data
+            self.mem_written(0x200, len(data))
 
-    def set_pixel(self, x, y):
-        if self.QUIRK_clipping:
-            if x >= self.resolution[0] or y >= self.resolution[1]:
-                return 1
-            
-            if x < 0 or y < 0:
-                return 1
-
-        pos = (x % self.resolution[0]) + (y % self.resolution[1]) * 64
-        self.disp[pos] = int(not self.disp[pos])
-        return int(not self.disp[pos])
-    
     def cycle(self):
-        time = pygame.time.get_ticks()
+        now = pygame.time.get_ticks()
+        # cap the backlog so a stalled window doesn't make the emulator race to catch up
+        self._acc_ms = min(self._acc_ms + now - self._last_ticks, self.frame_ms * 4)
+        self._last_ticks = now
+
         self.handle_input()
+
+        if self._acc_ms < self.frame_ms:
+            # nothing to emulate or draw yet
+            pygame.time.wait(int(self.frame_ms - self._acc_ms))
+            return
+
+        frames = int(self._acc_ms // self.frame_ms)
+        self._acc_ms -= frames * self.frame_ms
+
+        # the frames run now share the time left until the next one is due,
+        # whatever rendering takes is carried over in _acc_ms
+        budget_ms = (self.frame_ms - self._acc_ms) / frames
+        for _ in range(frames):
+            self.step_frame(budget_ms)
+
+        self.render()
+
+    def step_frame(self, budget_ms):
         if self.ipf > 0:
-            for _ in range(self.ipf):
-                self.tick()
+            self.run(self.ipf)
         else:
-            target_fps = 1000 // self.fps
+            # unlimited: run small batches until this frame's share of time is used up
+            get_ticks = pygame.time.get_ticks
+            run = self.run
+            deadline = get_ticks() + budget_ms
 
-            while pygame.time.get_ticks() - time < target_fps:
-                self.tick()
+            while get_ticks() < deadline:
+                run(64)
 
         self.update_timers()
-        self.render()
+
+        # display refresh, see QUIRK_disp_wait
+        self.interrupted = True
     
     def handle_input(self):
+        if not pygame.event.peek(self.input_events):
+            return
+
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 pygame.quit()
@@ -178,342 +324,479 @@ class Emulator:
             self.sound_timer -= 1
 
     def tick(self):
-        opcode = self.mem[self.pc] << 8 | self.mem[self.pc + 1]
-
-        x = (opcode & 0x0F00) >> 8
-        y = (opcode & 0x00F0) >> 4
-
-        self.pc += 2
-
-        match opcode & 0xF000:
-            case 0x0000:
-                match opcode & 0x00FF:
-                    case 0xE0:
-                        self.disp = bytearray([0] * self.resolution[0] * self.resolution[1])
-
-                    case 0xEE:
-                        self.pc = self.stack[self.sp]
-                        self.sp -= 1
-                        self.sp %= len(self.stack)
-                        self.pc <<= 8
-                        self.pc |= self.stack[self.sp]
-                        self.sp -= 1
-                        self.sp %= len(self.stack)
-
-            case 0x1000:
-                self.pc = opcode & 0x0FFF
-
-            case 0x2000:
-                self.sp += 1
-                self.sp %= len(self.stack)
-                self.stack[self.sp] = self.pc & 0x00FF
-                self.sp += 1
-                self.sp %= len(self.stack)
-                self.stack[self.sp] = self.pc >> 8
-                
-                self.pc = opcode & 0x0FFF
-
-            case 0x3000:
-                if self.regs[x] == opcode & 0x00FF:
-                    self.pc += 2
-
-            case 0x4000:
-                if self.regs[x] != opcode & 0x00FF:
-                    self.pc += 2
-
-            case 0x5000:
-                if self.regs[x] == self.regs[y]:
-                    self.pc += 2
-
-            case 0x6000:
-                self.regs[x] = opcode & 0x00FF
-
-            case 0x7000:
-                self.regs[x] += opcode & 0x00FF
-                self.regs[x] &= 0x00FF
-
-            case 0x8000:
-                match opcode & 0x000F:
-                    case 0x0000:
-                        self.regs[x] = self.regs[y]
-
-                    case 0x0001:
-                        self.regs[x] |= self.regs[y]
-                        if self.QUIRK_vF_reset:
-                            self.regs[0xF] = 0
-
-                    case 0x0002:
-                        self.regs[x] &= self.regs[y]
-                        if self.QUIRK_vF_reset:
-                            self.regs[0xF] = 0
-
-                    case 0x0003:
-                        self.regs[x] ^= self.regs[y]
-                        if self.QUIRK_vF_reset:
-                            self.regs[0xF] = 0
-
-                    case 0x0004:
-                        self.regs[x] += self.regs[y]
-                        self.regs[0xF] = 1 if self.regs[x] > 0xFF else 0
-                        self.regs[x] &= 0x00FF
-
-                    case 0x0005:
-                        self.regs[x] -= self.regs[y]
-                        self.regs[0xF] = 0 if self.regs[x] < 0 else 1
-                        self.regs[x] &= 0x00FF
-
-                    case 0x0006:
-                        if not self.QUIRK_shifting:
-                            self.regs[x] = self.regs[y]
-
-                        Rx = self.regs[x]
-                        self.regs[x] >>= 1
-                        self.regs[0xF] = Rx & 0x0001
-                        self.regs[x] &= 0x00FF
-
-                    case 0x0007:
-                        self.regs[x] = self.regs[y] - self.regs[x]
-                        self.regs[0xF] = 0 if self.regs[x] < 0 else 1
-                        self.regs[x] &= 0x00FF
-
-                    case 0x000E:
-                        if not self.QUIRK_shifting:
-                            self.regs[x] = self.regs[y]
-
-                        Rx = self.regs[x]
-                        self.regs[x] <<= 1
-                        self.regs[0xF] = (Rx & 0x0080) >> 7
-                        self.regs[x] &= 0x00FF
-
-            case 0x9000:
-                if self.regs[x] != self.regs[y]:
-                    self.pc += 2
-
-            case 0xA000:
-                self.i_reg = opcode & 0x0FFF
-
-            case 0xB000:
-                self.pc = (opcode & 0x0FFF) + (self.regs[x] if self.QUIRK_jumping else self.regs[0])
-
-            case 0xC000:
-                self.regs[x] = random.randint(0, 255) & (opcode & 0x00FF)
-
-            case 0xD000:
-                if self.QUIRK_disp_wait:
-                    if self.QUIRK_disp_wait_faker:
-                        self.update_timers()
-                    else:
-                        if self.interrupted:
-                            self.interrupted = False
-                        else:
-                            self.pc -= 2
-                            return
-
-                width  = 8
-                height = opcode & 0x000F
-
-                self.regs[0xF] = 0
-
-                for row in range(height):
-                    sprite = self.mem[self.i_reg + row]
-
-                    for col in range(width):
-                        if (sprite & 0x80) > 0:
-                            if self.set_pixel(self.regs[x] % 64 + col, self.regs[y] % 32 + row):
-                                self.regs[0xF] = 1
-
-                        sprite <<= 1
-                        sprite &= 0x00FF
-
-            case 0xE000:
-                match opcode & 0x00FF:
-                    case 0x009E:
-                        if self.kb[self.regs[x]]:
-                            self.pc += 2
-
-                    case 0x00A1:
-                        if not self.kb[self.regs[x]]:
-                            self.pc += 2
-
-            case 0xF000:
-                match opcode & 0x00FF:
-                    case 0x0007:
-                        self.regs[x] = self.delay_timer
-
-                    case 0x000A:
-                        if self.kb_interrupt is not None:
-                            self.regs[x] = self.kb_interrupt
-                            self.kb_interrupt = None
-
-                        else:
-                            self.pc -= 2
-                            return
-                    
-
-                    case 0x0015:
-                        self.delay_timer = self.regs[x]
-
-                    case 0x0018:
-                        self.sound_timer = self.regs[x]
-
-                    case 0x001E:
-                        self.i_reg += self.regs[x]
-                        self.i_reg &= 0x0FFF
-
-                    case 0x0029:
-                        self.i_reg = self.regs[x] * 5
-                        self.i_reg &= 0x0FFF
-
-                    case 0x0033:
-                        self.mem[self.i_reg + 0] = self.regs[x] // 100
-                        self.mem[self.i_reg + 1] = (self.regs[x] % 100) // 10
-                        self.mem[self.i_reg + 2] = self.regs[x] % 10
-
-                    case 0x0055:
-                        for i in range(x + 1):
-                            self.mem[self.i_reg + i] = self.regs[i]
-
-                        if self.QUIRK_memory:
-                            self.i_reg += x + 1
-                            self.i_reg &= 0x0FFF
-
-                    case 0x0065:
-                        for i in range(x + 1):
-                            self.regs[i] = self.mem[self.i_reg + i]
-
-                        if self.QUIRK_memory:
-                            self.i_reg += x + 1
-                            self.i_reg &= 0x0FFF
+        self.run(1)
 
-        self.kb_interrupt = None
+    def run(self, n):
+        # executes n instructions from decoded traces, so straight-line code
+        # and loops are only fetched and decoded the first time they run
+        traces = self._traces
+
+        while n > 0:
+            trace = traces.get(self.pc)
+            if trace is None:
+                trace = traces[self.pc] = self.decode_trace(self.pc)
+
+            for handler, opcode, x, y, next_pc in trace:
+                self.pc = next_pc
+
+                # handlers return True when the instruction stalls (waiting for display/key),
+                # nothing can end the stall before the next frame
+                if handler(opcode, x, y):
+                    return
+
+                self.kb_interrupt = None
+
+                n -= 1
+                if not n:
+                    return
+
+    def decode_trace(self, pc):
+        # A trace is the run of instructions starting at pc, up to and including
+        # the first one that may jump, skip, stall or write memory, stored as
+        # (handler, opcode, x, y, address of the next instruction)
+        mem = self.mem
+        trace = []
+
+        while True:
+            opcode = mem[pc] << 8 | mem[pc + 1]
+            pc += 2
+            trace.append((
+                self.decode(opcode),
+                opcode, (opcode & 0x0F00) >> 8, (opcode & 0x00F0) >> 4,
+                pc
+            ))
+
+            family = opcode >> 12
+            if family in (0x0, 0x1, 0x2, 0x3, 0x4, 0x5, 0x9, 0xB, 0xD, 0xE):
+                return trace
+
+            if family == 0xF and opcode & 0x00FF in (0x0A, 0x33, 0x55):
+                return trace
+
+            if pc + 1 >= len(mem):
+                return trace
+
+    def decode(self, opcode):
+        # resolve the handler through the family tables once, at decode time
+        entry = self._top[opcode >> 12]
+        if isinstance(entry, tuple):
+            table, mask = entry
+            return table.get(opcode & mask, self._op_nop)
+
+        return entry
+
+    def _op_nop(self, opcode, x, y):
+        pass
+
+    def _op0_E0(self, opcode, x, y):
+        self.disp[:] = 0
+        self._disp_dirty = True
+
+    def _op0_EE(self, opcode, x, y):
+        self.pc = self.stack[self.sp]
+        self.sp = (self.sp - 1) & self.sp_mask
+
+    def _op1(self, opcode, x, y):
+        self.pc = opcode & 0x0FFF
+
+    def _op2(self, opcode, x, y):
+        self.sp = (self.sp + 1) & self.sp_mask
+        self.stack[self.sp] = self.pc
+
+        self.pc = opcode & 0x0FFF
+
+    def _op3(self, opcode, x, y):
+        if self.regs[x] == opcode & 0x00FF:
+            self.pc += 2
+
+    def _op4(self, opcode, x, y):
+        if self.regs[x] != opcode & 0x00FF:
+            self.pc += 2
+
+    def _op5(self, opcode, x, y):
+        regs = self.regs
+        if regs[x] == regs[y]:
+            self.pc += 2
+
+    def _op6(self, opcode, x, y):
+        self.regs[x] = opcode & 0x00FF
+
+    def _op7(self, opcode, x, y):
+        regs = self.regs
+        regs[x] = (regs[x] + (opcode & 0x00FF)) & 0x00FF
+
+    def _op8_0(self, opcode, x, y):
+        regs = self.regs
+        regs[x] = regs[y]
+
+    def _op8_1(self, opcode, x, y):
+        regs = self.regs
+        regs[x] |= regs[y]
+
+    def _op8_1_vF_reset(self, opcode, x, y):
+        regs = self.regs
+        regs[x] |= regs[y]
+        regs[0xF] = 0
+
+    def _op8_2(self, opcode, x, y):
+        regs = self.regs
+        regs[x] &= regs[y]
+
+    def _op8_2_vF_reset(self, opcode, x, y):
+        regs = self.regs
+        regs[x] &= regs[y]
+        regs[0xF] = 0
+
+    def _op8_3(self, opcode, x, y):
+        regs = self.regs
+        regs[x] ^= regs[y]
+
+    def _op8_3_vF_reset(self, opcode, x, y):
+        regs = self.regs
+        regs[x] ^= regs[y]
+        regs[0xF] = 0
+
+    def _op8_4(self, opcode, x, y):
+        regs = self.regs
+        result = regs[x] + regs[y]
+        regs[x] = result & 0x00FF
+        regs[0xF] = result >> 8
+
+    def _op8_5(self, opcode, x, y):
+        regs = self.regs
+        Rx, Ry = regs[x], regs[y]
+        regs[x] = (Rx - Ry) & 0x00FF
+        regs[0xF] = 1 if Rx >= Ry else 0
+
+    def _op8_6(self, opcode, x, y):
+        regs = self.regs
+        Ry = regs[y]
+        regs[x] = Ry >> 1
+        regs[0xF] = Ry & 0x0001
+
+    def _op8_6_shifting(self, opcode, x, y):
+        regs = self.regs
+        Rx = regs[x]
+        regs[x] = Rx >> 1
+        regs[0xF] = Rx & 0x0001
+
+    def _op8_7(self, opcode, x, y):
+        regs = self.regs
+        Rx, Ry = regs[x], regs[y]
+        regs[x] = (Ry - Rx) & 0x00FF
+        regs[0xF] = 1 if Ry >= Rx else 0
+
+    def _op8_E(self, opcode, x, y):
+        regs = self.regs
+        Ry = regs[y]
+        regs[x] = (Ry << 1) & 0x00FF
+        regs[0xF] = (Ry & 0x0080) >> 7
+
+    def _op8_E_shifting(self, opcode, x, y):
+        regs = self.regs
+        Rx = regs[x]
+        regs[x] = (Rx << 1) & 0x00FF
+        regs[0xF] = (Rx & 0x0080) >> 7
+
+    def _op9(self, opcode, x, y):
+        regs = self.regs
+        if regs[x] != regs[y]:
+            self.pc += 2
+
+    def _opA(self, opcode, x, y):
+        self.i_reg = opcode & 0x0FFF
+
+    def _opB(self, opcode, x, y):
+        self.pc = (opcode & 0x0FFF) + self.regs[0]
+
+    def _opB_jumping(self, opcode, x, y):
+        self.pc = (opcode & 0x0FFF) + self.regs[x]
+
+    def _opC(self, opcode, x, y):
+        idx = self._rng_idx
+        self.regs[x] = self._rng_buf[idx] & (opcode & 0x00FF)
+
+        idx = (idx + 1) & 0x0FFF
+        if not idx:
+            self._rng_buf = random.randbytes(4096)
+        self._rng_idx = idx
+
+    def _opD_wait(self, opcode, x, y):
+        if self.interrupted:
+            self.interrupted = False
+        else:
+            self.pc -= 2
+            return True
+
+        self._opD(opcode, x, y)
+
+    def _opD_wait_faker(self, opcode, x, y):
+        self.update_timers()
+        self._opD(opcode, x, y)
+
+    def _opD(self, opcode, x, y):
+        width  = 8
+        height = opcode & 0x000F
+
+        regs = self.regs
+        disp = self.disp
+        disp_height, disp_width = disp.shape # from self.resolution
+
+        base_x = regs[x] % disp_width
+        base_y = regs[y] % disp_height
+
+        # one row of 0/1 pixels per sprite byte
+        i_reg = self.i_reg
+        if height == 5 and i_reg < 16 * 5 and i_reg % 5 == 0:
+            sprite = self._font_bits[i_reg // 5]
+        else:
+            sprite = np.unpackbits(
+                np.frombuffer(self.mem, dtype=np.uint8, count=height, offset=i_reg)
+            ).reshape(height, width)
+
+        if self.QUIRK_clipping:
+            visible = sprite[:disp_height - base_y, :disp_width - base_x]
+            region = disp[base_y:base_y + height, base_x:base_x + width]
+
+            collision = (region & visible).any()
+            region ^= visible
+
+            # clipped pixels count as collisions
+            if not collision and visible.shape != sprite.shape:
+                collision = np.count_nonzero(visible) != np.count_nonzero(sprite)
+        else:
+            region = np.ix_(
+                (base_y + np.arange(height)) % disp_height,
+                (base_x + np.arange(width)) % disp_width
+            )
+
+            old = disp[region]
+            disp[region] = old ^ sprite
+            collision = (old & sprite).any()
+
+        regs[0xF] = int(collision)
+        self._disp_dirty = True
+
+    def _opE_9E(self, opcode, x, y):
+        if self.kb[self.regs[x]]:
+            self.pc += 2
+
+    def _opE_A1(self, opcode, x, y):
+        if not self.kb[self.regs[x]]:
+            self.pc += 2
+
+    def _opF_07(self, opcode, x, y):
+        self.regs[x] = self.delay_timer
+
+    def _opF_0A(self, opcode, x, y):
+        if self.kb_interrupt is not None:
+            self.regs[x] = self.kb_interrupt
+            self.kb_interrupt = None
+
+        else:
+            self.pc -= 2
+            return True
+
+    def _opF_15(self, opcode, x, y):
+        self.delay_timer = self.regs[x]
+
+    def _opF_18(self, opcode, x, y):
+        self.sound_timer = self.regs[x]
+
+    def _opF_1E(self, opcode, x, y):
+        self.i_reg = (self.i_reg + self.regs[x]) & 0x0FFF
+
+    def _opF_29(self, opcode, x, y):
+        self.i_reg = (self.regs[x] * 5) & 0x0FFF
+
+    def _opF_33(self, opcode, x, y):
+        mem   = self.mem
+        i_reg = self.i_reg
+        Rx    = self.regs[x]
+        mem[i_reg + 0] = Rx // 100
+        mem[i_reg + 1] = (Rx % 100) // 10
+        mem[i_reg + 2] = Rx % 10
+        self.mem_written(i_reg, 3)
+
+    def _opF_55(self, opcode, x, y):
+        mem   = self.mem
+        regs  = self.regs
+        i_reg = self.i_reg
+        for i in range(x + 1):
+            mem[i_reg + i] = regs[i]
+        self.mem_written(i_reg, x + 1)
+
+    def _opF_55_memory(self, opcode, x, y):
+        self._opF_55(opcode, x, y)
+        self.i_reg = (self.i_reg + x + 1) & 0x0FFF
+
+    def _opF_65(self, opcode, x, y):
+        mem   = self.mem
+        regs  = self.regs
+        i_reg = self.i_reg
+        for i in range(x + 1):
+            regs[i] = mem[i_reg + i]
+
+    def _opF_65_memory(self, opcode, x, y):
+        self._opF_65(opcode, x, y)
+        self.i_reg = (self.i_reg + x + 1) & 0x0FFF
 
     def render(self):
-        self.screen.fill(self.bg_color)
+        screen = self.screen
 
-        surf = pygame.image.frombuffer(self.disp, (self.resolution[0], self.resolution[1]), "P")
-        surf.set_palette_at(0, self.off_color)
-        surf.set_palette_at(1, self.on_color)
+        # everything drawn this frame, blitted in one call at the end
+        blit_seq = []
 
         available_res = list(self.output_resolution)
         if self.live_mem_view:
             available_res[0] -= 128 * self.mem_view_scale
 
-        if self.preserve_aspect_ratio:
-            out_scale = min(
-                available_res[0] / self.resolution[0],
-                available_res[1] / self.resolution[1]
-            )
+        resized = available_res != self._cached_res
+
+        # the debug overlays are redrawn every frame and need a clean background,
+        # otherwise the display covers the same area as last frame
+        if resized or self.live_mem_view or self.show_fps:
+            screen.fill(self.bg_color)
+
+        if resized:
+            if self.preserve_aspect_ratio:
+                out_scale = min(
+                    available_res[0] / self.resolution[0],
+                    available_res[1] / self.resolution[1]
+                )
+                self._target_size = (int(self.resolution[0] * out_scale), int(self.resolution[1] * out_scale))
+            else:
+                self._target_size = tuple(available_res)
 
             if self.scaling_method == "nearest":
-                surf = pygame.transform.scale_by(surf, out_scale)
+                self._scaled_surf = pygame.Surface(self._target_size, depth=8)
+                self.apply_palette(self._scaled_surf)
             elif self.scaling_method == "smooth":
-                surf = pygame.transform.smoothscale_by(surf.convert(), out_scale)
-            else:
-                raise Exception(f"Invalid scaling method: {self.scaling_method}")
-        else:
+                self._scaled_surf = pygame.Surface(self._target_size, 0, self._src_surf32)
+
+        if self._disp_dirty or self._cached_surf is None or resized:
             if self.scaling_method == "nearest":
-                surf = pygame.transform.scale(surf, self.available_res)
+                surf = pygame.transform.scale(self._src_surf, self._target_size, self._scaled_surf)
             elif self.scaling_method == "smooth":
-                surf = pygame.transform.smoothscale(surf.convert(), self.available_res)
+                np.take(self._palette32, self.disp, out=self._disp32)
+                surf = pygame.transform.smoothscale(self._src_surf32, self._target_size, self._scaled_surf)
             else:
                 raise Exception(f"Invalid scaling method: {self.scaling_method}")
 
-        self.screen.blit(surf, surf.get_rect(center=(available_res[0]//2, available_res[1]//2)))
+            self._cached_surf = surf
+            self._cached_res  = available_res
+            self._disp_dirty  = False
+
+        surf = self._cached_surf
+        blit_seq.append((surf, surf.get_rect(center=(available_res[0]//2, available_res[1]//2))))
 
         if self.live_mem_view:
             height = 0
-            mem_txt = self.font.render(f"Memory:", True, self.on_color)
-            self.screen.blit(
+            mem_txt = self.text_to_surf(f"Memory:")
+            blit_seq.append((
                 mem_txt,
                 (available_res[0], height)
-            )
+            ))
             height += mem_txt.get_height() + 5
 
             mem_dump = pygame.transform.scale_by(
                 self.mem_to_surf(),
                 self.mem_view_scale
             )
-            self.screen.blit(
+            blit_seq.append((
                 mem_dump,
                 (available_res[0], height),
-            )
+            ))
             height += mem_dump.get_height() + 5
 
-            stack_txt = self.font.render(f"Stack:", True, self.on_color)
-            self.screen.blit(
+            stack_txt = self.text_to_surf(f"Stack:")
+            blit_seq.append((
                 stack_txt,
                 (available_res[0], height)
-            )
+            ))
             height += stack_txt.get_height() + 5
 
             stack_dump = pygame.transform.scale_by(
                 self.stack_to_surf(),
                 self.mem_view_scale
             )
-            self.screen.blit(
+            blit_seq.append((
                 stack_dump,
                 (available_res[0], height),
-            )
+            ))
             height += stack_dump.get_height() + 5
 
             for i, reg in enumerate(self.regs):
-                reg_txt = self.font.render(f"V{i:01X}: {reg:02X}", True, self.on_color)
-                self.screen.blit(
+                reg_txt = self.text_to_surf(f"V{i:01X}: {reg:02X}")
+                blit_seq.append((
                     reg_txt,
                     (available_res[0], height)
-                )
+                ))
                 height += reg_txt.get_height() + 5
 
-            i_reg_txt = self.font.render(f"I: {self.i_reg:04X}", True, self.on_color)
-            self.screen.blit(
+            i_reg_txt = self.text_to_surf(f"I: {self.i_reg:04X}")
+            blit_seq.append((
                 i_reg_txt,
                 (available_res[0], height)
-            )
+            ))
             height += i_reg_txt.get_height() + 5
 
         if self.show_fps:
-            fps_txt = self.font.render(f"FPS: {self.clock.get_fps():.2f}", True, self.on_color)
-            pygame.draw.rect(self.screen, self.bg_color, fps_txt.get_rect(topright = self.screen.get_rect().topright))
-            self.screen.blit(
+            fps_txt = self.text_to_surf(f"FPS: {self.clock.get_fps():.2f}", opaque=True)
+            blit_seq.append((
                 fps_txt,
-                fps_txt.get_rect(topright = self.screen.get_rect().topright)
-            )
+                fps_txt.get_rect(topright = screen.get_rect().topright)
+            ))
+
+        screen.blits(blit_seq, doreturn=False)
 
         pygame.display.flip()
 
-        self.clock.tick(self.fps * (not self.vsync))
+        # with vsync, flip() already waits for the display
+        if self.vsync:
+            self.clock.tick()
+        else:
+            self.clock.tick(self.fps)
 
-        self.interrupted = True
+    def text_to_surf(self, text, opaque=False):
+        # opaque text is drawn over bg_color instead of a transparent background
+        key = (text, opaque)
+        surf = self._text_cache.pop(key, None)
+        if surf is None:
+            surf = self.font.render(text, True, self.on_color, self.bg_color if opaque else None)
+            if len(self._text_cache) >= self._text_cache_size:
+                del self._text_cache[next(iter(self._text_cache))]
+
+        self._text_cache[key] = surf
+        return surf
+
+    def apply_palette(self, surf):
+        surf.set_palette_at(0, self.off_color)
+        surf.set_palette_at(1, self.on_color)
 
     def mem_to_surf(self):
-        mem_dump = pygame.image.frombuffer(bytes(
-            int(bit) for byte in self.mem for bit in bin(byte)[2:].zfill(8)
-        ), (128, 256), "P")
-        mem_dump.set_palette_at(0, self.off_color)
-        mem_dump.set_palette_at(1, self.on_color)
+        bits = np.unpackbits(np.frombuffer(self.mem, dtype=np.uint8))
+        mem_dump = pygame.image.frombuffer(bits.tobytes(), (128, 256), "P")
+        self.apply_palette(mem_dump)
         return mem_dump
     
     def stack_to_surf(self):
-        stack_dump_size = len(self.stack) * 8
+        stack_dump_size = len(self.stack) * 16
         stack_dump_width = 128
         if stack_dump_size % stack_dump_width == 0:
             stack_dump_height = stack_dump_size // stack_dump_width
         else:
             stack_dump_height = (stack_dump_size // stack_dump_width) + 1
 
-        stack_copy = [0] * stack_dump_width * stack_dump_height
-        for i, byte in enumerate(self.stack):
-            for j in range(8):
-                stack_copy[i*8 + j] = (byte >> j) & 1
-
-        stack_copy = bytes(stack_copy)
+        # 16 bits per return address, least significant bit first
+        stack_copy = np.zeros(stack_dump_width * stack_dump_height, dtype=np.uint8)
+        stack_copy[:stack_dump_size] = np.unpackbits(
+            np.asarray(self.stack, dtype="<u2").view(np.uint8), bitorder="little"
+        )
 
-        stack_dump = pygame.image.frombuffer(bytes(
-            bit for bit in stack_copy
-        ), (stack_dump_width, stack_dump_height), "P")
+        stack_dump = pygame.image.frombuffer(stack_copy.tobytes(), (stack_dump_width, stack_dump_height), "P")
 
-        stack_dump.set_palette_at(0, self.off_color)
-        stack_dump.set_palette_at(1, self.on_color)
+        self.apply_palette(stack_dump)
         return stack_dump                        
 
 def main():